@@ -8,11 +8,60 @@ import re
 import os
 from datetime import datetime
 import logging
+import csv
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv  # optional: multi-threaded CSV reader
+except ImportError:
+    pa = pacsv = None
 
 # constants
 NIGHT_START = 21
 NIGHT_END = 7
 
+# header detection reads at most HEADER_SCAN_LIMIT bytes
+HEADER_MARKERS = (b"calling party telephone number", b"target /a party number", b"target no")
+HEADER_CHUNK_SIZE = 64 * 1024
+HEADER_SCAN_LIMIT = 1024 * 1024
+_RE_HEADER = re.compile(b"|".join(re.escape(m) for m in HEADER_MARKERS))
+
+# files parsed side by side at most
+LOAD_WORKERS = 8
+# raw rows held at once while a file is reduced to its canonical columns
+LOAD_CHUNK_ROWS = 100_000
+
+# pandas' default NA strings, so the pyarrow reader blanks the same cells as read_csv(dtype=str)
+CSV_NULL_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                   "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+# explicit formats tried column-wide before the per-value fallback
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d")
+TIME_FORMATS = ("%H:%M:%S", "%H:%M", "%I:%M:%S %p", "%I:%M %p")
+TIME_BASE = pd.Timestamp("1900-01-01")  # date strptime gives a bare time
+
+# compiled once, shared by the scalar helpers and the column-wide paths
+_RE_NON_DIGIT = re.compile(r"\D")
+_RE_WS = re.compile(r"\s+")
+_RE_ALPHA = re.compile(r"[A-Za-z]")
+_RE_HHMMSS = re.compile(r"\d{6}")
+_RE_HHMM = re.compile(r"\d{4}")
+_RE_HMS = re.compile(r"^(\d+):(\d+)(?::(\d+))?$")
+
+# low-cardinality output columns stored as categoricals (blanks filled first)
+CATEGORY_COLUMNS = (
+    "CDR Party No", "CallTypeStd", "FIRST_CELL_ID_A", "LAST_CELL_ID_A", "ESN_IMEI_A", "IMSI_A",
+    "Opp Party-SP State", "ROAM_CIRCLE", "Home Circle", "Opp Party-Service Provider"
+)
+# one value per cell site; NaN (no such column in the file) is kept as missing, not filled
+SITE_CATEGORY_COLUMNS = (
+    "First_Cell_Site_Address", "Last_Cell_Site_Address", "First_Cell_Site_Name-City",
+    "Last_Cell_Site_Name-City", "First_Lat_Long", "Last_Lat_Long"
+)
+
 # aliases for column detection
 ALIASES = { 
     "target_number": ["target /a party number","target no","cdr party no","target"],
@@ -42,6 +91,33 @@ ALIASES = {
     "operator": ["operator","service provider","sp","provider"]
 }
 
+# reverse lookup built once: header (lowercased) -> [(key, preference)], lower preference wins;
+# a header can serve several keys ("toc" is both a call_type and a toc alias)
+ALIAS_KEYS = {}
+for _key, _aliases in ALIASES.items():
+    for _rank, _alias in enumerate(_aliases):
+        ALIAS_KEYS.setdefault(_alias, []).append((_key, _rank))
+
+
+@lru_cache(maxsize=512)
+def _scan_header_start(path, mtime_ns, size):
+    # Markers sit in the first few lines; scan raw bytes a chunk at a time, never the whole file.
+    # mtime_ns / size are only part of the cache key.
+    try:
+        with open(path, "rb") as f:
+            head = b""
+            while len(head) < HEADER_SCAN_LIMIT:
+                chunk = f.read(HEADER_CHUNK_SIZE)
+                if not chunk:
+                    break
+                head += chunk.lower()
+                hit = _RE_HEADER.search(head)  # leftmost of all markers in one pass
+                if hit:
+                    return head.count(b"\n", 0, hit.start())
+    except Exception:
+        pass
+    return 0
+
 
 class CDRProcessor:
     def __init__(self, progress_callback=None):
@@ -62,131 +138,265 @@ class CDRProcessor:
         for c in candidates:
             if c in cols_map:
                 return df[cols_map[c]]
-        return pd.Series([np.nan]*len(df), index=df.index)
+        return pd.Series(np.nan, index=df.index)  # scalar broadcast, no n-long list
+
+    def _source_columns(self, columns):
+        """ALIASES key -> header picked for it, in one pass over the headers (same choice as _pick)."""
+        best = {}
+        for col in columns:
+            for key, rank in ALIAS_KEYS.get(str(col).lower().strip(), ()):
+                if key not in best or rank <= best[key][0]:  # <=: a later duplicate header wins, like _lower_map
+                    best[key] = (rank, col)
+        return {key: col for key, (rank, col) in best.items()}
 
     def detect_header_start(self, path):
+        # 🔑 cached per (path, mtime, size): reloading an unchanged file skips the scan
         try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                for i, line in enumerate(f):
-                    l = line.lower()
-                    if ("calling party telephone number" in l) or ("target /a party number" in l) or ("target no" in l):
-                        return i
-        except Exception:
-            pass
-        return 0
-
-    def load_csv_file(self, path):
+            st = os.stat(path)
+        except OSError:
+            return 0
+        return _scan_header_start(path, st.st_mtime_ns, st.st_size)
+
+    def load_csv_file(self, path, each=None):
+        """The CSV as text columns; each(chunk) runs per LOAD_CHUNK_ROWS rows, before the chunks are joined."""
+        # no progress from here: files load side by side, so process_files reports the overall percentage
+        each = each or (lambda chunk: chunk)
         try:
-            self.update_progress(10, f"Loading {os.path.basename(path)}")
             start = self.detect_header_start(path)
-            df = pd.read_csv(path, engine="python", sep=",", header=0, skiprows=start, dtype=str, on_bad_lines="skip")
-            df = df.loc[:, ~pd.Index(df.columns).duplicated()]
-            self.update_progress(20, f"Loaded {len(df)} rows")
-            return df
+            table = self.read_csv_arrow(path, start) if pacsv is not None else None
+            if table is not None:
+                # slices are zero-copy; only one chunk at a time becomes Python strings
+                parts = [each(self.arrow_frame(table.slice(i, LOAD_CHUNK_ROWS)))
+                         for i in range(0, max(table.num_rows, 1), LOAD_CHUNK_ROWS)]
+            else:
+                try:
+                    with pd.read_csv(path, engine="c", sep=",", header=0, skiprows=start, dtype=str,
+                                     on_bad_lines="skip", low_memory=False, memory_map=True,
+                                     chunksize=LOAD_CHUNK_ROWS) as reader:
+                        parts = [each(chunk) for chunk in reader]
+                except pd.errors.ParserError as e:
+                    # the C tokenizer gives up on some malformed files (e.g. an unclosed quote); the python one copes
+                    logging.warning(f"C parser failed on {path} ({e}), retrying with the python engine")
+                    parts = [each(pd.read_csv(path, engine="python", sep=",", header=0, skiprows=start, dtype=str,
+                                              on_bad_lines="skip"))]
+            return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
         except Exception as e:
             logging.error(f"Error loading {path}: {e}")
             raise
 
-    def to_seconds(self, x):
-        if pd.isna(x): return 0
-        s = str(x).strip().strip("'")
-        if s == "": return 0
-        if s.isdigit():
-            return int(s)
-        try:
-            parts = s.split(":")
-            if len(parts) == 3:
-                h,m,ss = map(int, parts); return h*3600 + m*60 + ss
-            if len(parts) == 2:
-                m,ss = map(int, parts); return m*60 + ss
-        except Exception:
-            pass
+    def read_csv_arrow(self, path, start):
+        """Read a well-formed CSV with pyarrow into a table of text columns; None sends the file to read_csv."""
         try:
-            return int(float(s))
-        except Exception:
-            return 0
+            with open(path, newline="", encoding="utf-8-sig") as f:  # read_csv drops a BOM too
+                names = next(csv.reader(islice(f, start, None)), None)
+            # pandas renames blank and repeated headers ("Unnamed: 3", "Date.1"); leave those files to it
+            if not names or "" in names or len(set(names)) != len(names):
+                return None
+            table = pacsv.read_csv(
+                path,
+                read_options=pacsv.ReadOptions(skip_rows=start + 1, column_names=names),
+                convert_options=pacsv.ConvertOptions(column_types={n: pa.string() for n in names},
+                                                     null_values=CSV_NULL_VALUES, strings_can_be_null=True),
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            )
+        except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+            # ragged rows are skipped or padded by read_csv; pyarrow can only reject them
+            logging.info(f"pyarrow could not read {path} ({e}), using read_csv")
+            return None
+        return table
+
+    def arrow_frame(self, table):
+        df = table.to_pandas()
+        return df.where(df.notna(), np.nan)  # nulls come back as None; read_csv gives NaN
+
+    def load_file_frame(self, path, index):
+        """Load one CSV onto the canonical columns, tagged with its position in the file list."""
+        if self.cancel_flag: raise Exception("Cancelled")
+        # 🔑 canonicalised chunk by chunk: the raw text of every column is never held for the whole file
+        frame = self.load_csv_file(path, each=self.canonical_frame)
+        frame["SourceFile"] = index  # a fresh frame, so tag it in place; assign() would copy every column
+        return frame
+
+    def to_seconds(self, x):
+        """Scalar form of to_seconds_series, for callers with a single value."""
+        return int(self.to_seconds_series(pd.Series([x], dtype=object)).iat[0])
+
+    def to_seconds_series(self, series):
+        # 🔑 durations repeat a lot; clean and parse each distinct text once
+        return self.map_distinct(self.as_text(series), self._text_to_seconds)
+
+    def _text_to_seconds(self, s):
+        s = s.str.strip().str.strip("'")
+        secs = pd.to_numeric(s, errors="coerce")
+        hms = s.str.extract(_RE_HMS).astype(float)
+        colon = (hms[0] * 3600 + hms[1] * 60 + hms[2]).fillna(hms[0] * 60 + hms[1])
+        secs = colon.fillna(secs)  # combine_first warns (empty-entry concat) when no value has a colon
+        secs = secs.where(np.isfinite(secs), 0)
+        return np.trunc(secs).astype("int64")
 
     def parse_time_field(self, x):
-        s = str(x).strip().strip("'")
-        for fmt in ("%H:%M:%S","%H:%M","%I:%M:%S %p","%I:%M %p"):
-            try:
-                return pd.to_datetime(s, format=fmt).time()
-            except Exception:
-                continue
-        if re.fullmatch(r"\d{6}", s):
-            try:
-                return pd.to_datetime(s, format="%H%M%S").time()
-            except:
-                return None
-        if re.fullmatch(r"\d{4}", s):
-            try:
-                return pd.to_datetime(s, format="%H%M").time()
-            except:
-                return None
-        return None
+        """Scalar form of parse_time_series: a datetime.time, or None."""
+        t = self.parse_time_series(pd.Series([x], dtype=object)).iat[0]
+        return None if pd.isna(t) else t.time()
 
     def parse_date_field(self, x):
-        s = str(x).strip().strip("'").replace(".", "/")
-        try:
-            return pd.to_datetime(s, dayfirst=True, errors="coerce").date()
-        except Exception:
-            try:
-                return pd.to_datetime(s, dayfirst=False, errors="coerce").date()
-            except Exception:
-                return None
+        """Scalar form of parse_date_series: a datetime.date, or None."""
+        d = self.parse_date_series(pd.Series([x], dtype=object)).iat[0]
+        return None if pd.isna(d) else d.date()
+
+    def parse_with_formats(self, s, formats):
+        # each format only sees what the earlier ones left unparsed; stops once nothing is left
+        result = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+        left = pd.Series(True, index=s.index)
+        for fmt in formats:
+            if not left.any():
+                break
+            result[left] = pd.to_datetime(s[left], format=fmt, dayfirst=True, errors="coerce")
+            left = result.isna()
+        return result, left
+
+    def map_distinct(self, s, func):
+        """func over the distinct values of s only (missing kept as one value), broadcast back onto s's index."""
+        codes, uniques = pd.factorize(s, use_na_sentinel=False)
+        out = func(pd.Series(uniques))
+        return pd.Series(out.to_numpy()[codes], index=s.index)
+
+    def parse_date_series(self, series):
+        # 🔑 a file holds a few hundred distinct dates; clean and parse those, not every row
+        return self.map_distinct(self.as_text(series), self._parse_dates)
+
+    def _parse_dates(self, s):
+        s = s.str.strip().str.strip("'").str.replace(".", "/", regex=False)
+        # "mixed" (dayfirst) is the last resort for whatever no explicit format matched
+        result, _ = self.parse_with_formats(s, DATE_FORMATS + ("mixed",))
+        return result.dt.normalize()
+
+    def parse_time_series(self, series):
+        # times are returned on TIME_BASE, like pd.to_datetime(..., format="%H:%M:%S")
+        return self.map_distinct(self.as_text(series), self._parse_times)
+
+    def _parse_times(self, s):
+        s = s.str.strip().str.strip("'")
+        result, _ = self.parse_with_formats(s, TIME_FORMATS)
+        for pattern, fmt in ((_RE_HHMMSS, "%H%M%S"), (_RE_HHMM, "%H%M")):
+            left = result.isna() & s.str.fullmatch(pattern)
+            if left.any():
+                result[left] = pd.to_datetime(s[left], format=fmt, errors="coerce")
+        return result
 
     def normalize_msisdn(self, num):
-        if pd.isna(num): return ""
-        s = re.sub(r"\D", "", str(num))
-        if s.startswith("0"):
-            s = s.lstrip("0")
-        if s.startswith("91") and len(s) > 10:
-            s = s[2:]
-        return s
+        """Scalar form of normalize_msisdn_series ("" for missing)."""
+        return self.normalize_msisdn_series(pd.Series([num], dtype=object)).iat[0]
+
+    def normalize_msisdn_series(self, series):
+        # 🔑 normalise each distinct number once; A/B/target columns repeat the same few numbers
+        return self.map_distinct(self.as_text(series), self._normalize_msisdn_text)
+
+    def _normalize_msisdn_text(self, s):
+        s = s.str.replace(_RE_NON_DIGIT, "", regex=True).str.lstrip("0")
+        has_cc = s.str.startswith("91") & (s.str.len() > 10)
+        return s.where(~has_cc, s.str[2:])
+
+    def as_text(self, series):
+        """str(v) per cell, "" for missing; numeric columns only stringify their distinct values."""
+        if series.dtype == object:
+            if pd.api.types.infer_dtype(series, skipna=False) == "string":
+                return series  # already text, no copy
+            # mixed per-file columns: 98.0 and 98 are equal keys but render differently, so no factorising
+            return series.astype(str).where(series.notna(), "")
+        return self.map_distinct(series, lambda u: u.astype(str).where(u.notna(), ""))
 
     def contains_sender_code(self, s):
-        return bool(s and re.search(r"[A-Za-z]", str(s)))
+        """Scalar form of contains_sender_code_series."""
+        return bool(self.contains_sender_code_series(pd.Series([s], dtype=object)).iat[0])
+
+    def contains_sender_code_series(self, series):
+        # letters mark a sender code (e.g. AD-HDFCBK); searched once per distinct value
+        return self.map_distinct(self.as_text(series), lambda u: u.str.contains(_RE_ALPHA))
 
     def clean_text(self, s):
         if s is None or (isinstance(s, float) and np.isnan(s)): return ""
-        return re.sub(r"\s+", " ", str(s)).strip()
+        return _RE_WS.sub(" ", str(s)).strip()
 
     def is_night_hour(self, hour):
-        try:
-            if pd.isna(hour): return False
-            h = int(hour)
-            return (h >= NIGHT_START) or (h < NIGHT_END)
-        except Exception:
-            return False
+        """Scalar form of is_night_series; anything that is not a number is not night."""
+        return bool(self.is_night_series(pd.to_numeric(pd.Series([hour], dtype=object), errors="coerce")).iat[0])
+
+    def is_night_series(self, hours):
+        # missing hours compare False on both sides, so they are never night
+        return (hours >= NIGHT_START) | (hours < NIGHT_END)
+
+    def most_common(self, series):
+        """Most frequent non-empty value ("" if none); ties go to the smallest, like mode().iat[0]."""
+        counts = series[series.notna() & series.ne("")].value_counts()
+        if counts.empty:
+            return ""
+        return counts.index[counts.eq(counts.iat[0])].min()
+
+    def canonical_frame(self, df):
+        """One stripped column per ALIASES key ("" for blank cells); keys with no matching header stay NaN."""
+        if df.columns.has_duplicates:
+            df = df.loc[:, ~df.columns.duplicated()]
+        sources = self._source_columns(df.columns)
+        # 🔑 only the source columns some key resolves to are stripped, each once (call_type and toc may share one)
+        stripped = {}
+        canon = {}
+        for key in ALIASES:
+            src = sources.get(key)
+            if src is None:
+                canon[key] = np.nan
+                continue
+            if src not in stripped:
+                stripped[src] = self.strip_text_column(df[src])
+            canon[key] = stripped[src]
+        return pd.DataFrame(canon, index=df.index)
+
+    def strip_text_column(self, col):
+        """str(v).strip() per cell, "" for missing; computed once per distinct value (CDR columns repeat heavily)."""
+        codes, uniques = pd.factorize(col)
+        cleaned = np.append(pd.Index(uniques).astype(str).str.strip().to_numpy(dtype=object), "")
+        return pd.Series(cleaned[codes], index=col.index)  # code -1 (missing) picks the trailing ""
 
     def standardize_rows(self, df):
         try:
             self.update_progress(30, "Standardizing DATA ...")
-            cols = self._lower_map(df.columns)
-            pick = lambda k: self._pick(cols, df, ALIASES[k])
-            def to_int_safe(series, name=""):
-                series = series.fillna("")  # treat missing as empty string
-                numeric = pd.to_numeric(series, errors='coerce')
-                mask_bad = numeric.isna() & series.ne("")  # rows that failed numeric conversion
+            # accepts a raw CSV frame, or canonical frames concatenated by process_files
+            if "SourceFile" not in df.columns:
+                df = self.canonical_frame(df).assign(SourceFile=0)
+            source = df["SourceFile"]
+            pick = lambda k: df[k]
+            def to_int_text_file(series, name=""):
+                # 🔑 converted and rendered once per distinct value; the numeric dtype (int, or float once a
+                # blank is present) is still decided by the whole file's values
+                codes, uniques = pd.factorize(series.fillna(""))  # treat missing as empty string
+                values = pd.Series(uniques, dtype=object)
+                numeric = pd.to_numeric(values, errors='coerce')
+                mask_bad = numeric.isna() & values.ne("")  # values that failed numeric conversion
                 if mask_bad.any():
-                    logging.warning(f"[WARN] {mask_bad.sum()} non-numeric values in column '{name}', kept as string.")
+                    bad_rows = np.bincount(codes, minlength=len(values))[mask_bad.to_numpy()].sum()
+                    logging.warning(f"[WARN] {bad_rows} non-numeric values in column '{name}', kept as string.")
                     # Convert to object dtype and put original values back
                     numeric = numeric.astype(object)
-                    numeric[mask_bad] = series[mask_bad]
-                return numeric  # may be mixed int+str but no data loss
+                    numeric[mask_bad] = values[mask_bad]
+                text = numeric.astype(str).where(numeric.notna(), "")  # no data loss, "" for blanks
+                return pd.Series(text.to_numpy(dtype=object)[codes], index=series.index)
 
-          
-            df = df.applymap(lambda x: str(x).strip() if pd.notnull(x) else "")
+            def to_int_text(series, name=""):
+                # per file, so blanks in one file don't turn another file's integers into floats
+                parts = [to_int_text_file(part, name) for _, part in series.groupby(source, sort=False)]
+                if len(parts) <= 1:
+                    return parts[0] if parts else to_int_text_file(series, name)
+                return pd.concat(parts).reindex(series.index)
 
             Raw = pd.DataFrame({
-                # Big numeric fields → safe numeric conversion
-                'TargetRaw': to_int_safe(pick('target_number'), name="Target Number"),
-                'Araw': to_int_safe(pick('a_party'), name="A Party"),
-                'Braw': to_int_safe(pick('b_party'), name="B Party"),
-                'IMEI': to_int_safe(pick('imei'), name="IMEI"),
-                'IMSI': to_int_safe(pick('imsi'), name="IMSI"),
-                'FirstCellID': to_int_safe(pick('first_cell_id'), name="First Cell ID"),
-                'LastCellID': to_int_safe(pick('last_cell_id'), name="Last Cell ID"),
+                # Big numeric fields → safe numeric conversion, kept as their text
+                'TargetRaw': to_int_text(pick('target_number'), name="Target Number"),
+                'Araw': to_int_text(pick('a_party'), name="A Party"),
+                'Braw': to_int_text(pick('b_party'), name="B Party"),
+                'IMEI': to_int_text(pick('imei'), name="IMEI"),
+                'IMSI': to_int_text(pick('imsi'), name="IMSI"),
+                'FirstCellID': to_int_text(pick('first_cell_id'), name="First Cell ID"),
+                'LastCellID': to_int_text(pick('last_cell_id'), name="Last Cell ID"),
 
                 # Other fields remain as clean strings
                 'CallDateRaw': pick('call_date'),
@@ -198,43 +408,44 @@ class CDRProcessor:
                 'LastCellAddr': pick('last_cell_addr'),
                 'FirstCellCity': pick('first_cell_city'),
                 'LastCellCity': pick('last_cell_city'),
-                'FirstLatLong': self._pick(cols, df, ALIASES.get('first_lat_long', [])),
-                'LastLatLong': self._pick(cols, df, ALIASES.get('last_lat_long', [])),
+                'FirstLatLong': pick('first_lat_long'),
+                'LastLatLong': pick('last_lat_long'),
                 'Circle': pick('circle'),
                 'HomeCircle': pick('home_circle'),
                 'operator': pick('operator'),
-                'SMSC': self._pick(cols, df, ALIASES.get('smsc', []))
+                'SMSC': pick('smsc')
             })
 
             # ✅ Parse date & time safely
-            Raw['DateObj'] = Raw['CallDateRaw'].apply(self.parse_date_field) #type: ignore
-            Raw['TimeObj'] = Raw['CallTimeRaw'].apply(self.parse_time_field) #type: ignore
-            Raw['start_dt'] = pd.to_datetime(
-                [pd.NaT if (d is None or pd.isna(d) or t is None) else f"{d} {t}" #type: ignore
-                for d, t in zip(Raw['DateObj'], Raw['TimeObj'])],
-                errors="coerce"
-            )
-
-            # ✅ Call duration stays numeric
-            Raw['CALL_DURATION'] = pd.to_numeric(Raw['DurationRaw'], errors='coerce').fillna(0).astype('Int64')
-
-            # ✅ Normalize numbers (convert to str first, since some may be strings)
-            Raw['A_norm'] = Raw['Araw'].astype(str).apply(self.normalize_msisdn)
-            Raw['B_norm'] = Raw['Braw'].astype(str).apply(self.normalize_msisdn)
-            Raw['Target_norm'] = Raw['TargetRaw'].astype(str).apply(self.normalize_msisdn)
-
-            # ✅ Pick main number safely
-            if Raw['Target_norm'].replace('', np.nan).dropna().shape[0] > 0:
-                top = Raw['Target_norm'].replace('', np.nan).mode().iat[0]
-            else:
-                combined = pd.concat([Raw['A_norm'], Raw['B_norm']], ignore_index=True)
-                combined = combined[combined != ""]
-                top = combined.mode().iat[0] if not combined.empty else ""
-            Raw['CdrNo'] = top
+            dates = self.parse_date_series(Raw['CallDateRaw'])
+            times = self.parse_time_series(Raw['CallTimeRaw'])
+            Raw['start_dt'] = dates + (times - TIME_BASE)  # datetime64 arithmetic, no string round-trip
+
+            # ✅ Call duration in seconds (plain, H:M:S and M:S values)
+            Raw['CALL_DURATION'] = self.to_seconds_series(Raw['DurationRaw']).astype('Int64')
+
+            # ✅ Normalize numbers (their text, since some may be strings)
+            a_raw, b_raw = Raw['Araw'], Raw['Braw']  # already text; reused for the counterparty
+            Raw['A_norm'] = self.normalize_msisdn_series(a_raw)
+            Raw['B_norm'] = self.normalize_msisdn_series(b_raw)
+            Raw['Target_norm'] = self.normalize_msisdn_series(Raw['TargetRaw'])
+
+            # ✅ Pick main number safely, once per source file
+            Raw['CdrNo'] = ""
+            for rows in source.groupby(source, sort=False).groups.values():
+                top = self.most_common(Raw.loc[rows, 'Target_norm'])
+                if top == "":
+                    # no target number: most common A/B number, hash-counted per column and summed (no concat, no sort)
+                    a_rows, b_rows = Raw.loc[rows, 'A_norm'], Raw.loc[rows, 'B_norm']
+                    counts = a_rows[a_rows.ne("")].value_counts().add(
+                        b_rows[b_rows.ne("")].value_counts(), fill_value=0)
+                    if not counts.empty:
+                        top = counts.index[counts.eq(counts.max())].min()  # ties go to the smallest, as before
+                Raw.loc[rows, 'CdrNo'] = top
 
           
-            def derive_call_type(ct, toc):
-                s = f"{ct} {toc}".lower()
+            def derive_call_type(text):
+                s = text.lower()
                 is_sms = 'sms' in s
                 if is_sms:
                     d = 'IN' if any(k in s for k in ['inbound','mt','terminat','smsin','sms_in']) else 'OUT'
@@ -247,27 +458,39 @@ class CDRProcessor:
                         d = 'OUT'
                 return ('SMS' if is_sms else 'CALL') + '_' + d
 
-            Raw['CallTypeStd'] = [derive_call_type(ct, toc) for ct, toc in zip(Raw['CallTypeRaw'], Raw['TOC'])]
-
-            def pick_counterparty(row):
-                a_raw, b_raw = str(row['Araw']), str(row['Braw'])
-                a_num, b_num = row['A_norm'], row['B_norm']
-                t = str(row['CdrNo'])
-                ctype = str(row['CallTypeStd'])
-                if ctype.startswith("SMS"):
-                    if self.contains_sender_code(b_raw): return b_raw
-                    if self.contains_sender_code(a_raw): return a_raw
-                if a_num == t and b_num: return b_num
-                if b_num == t and a_num: return a_num
-                return b_num or a_num or b_raw or a_raw or ""
-
-            Raw['Counterparty'] = Raw.apply(pick_counterparty, axis=1)
+            # 🔑 classify each distinct "<call type> <toc>" text once, then broadcast by code
+            type_text = Raw['CallTypeRaw'].astype(str) + " " + Raw['TOC'].astype(str)
+            codes, uniques = pd.factorize(type_text)
+            Raw['CallTypeStd'] = np.array([derive_call_type(u) for u in uniques], dtype=object)[codes]
+
+            # ✅ Pick counterparty: SMS sender codes first, then the number that isn't the target
+            a_num, b_num = Raw['A_norm'], Raw['B_norm']
+            t = Raw['CdrNo']
+            is_sms = Raw['CallTypeStd'].str.startswith("SMS")
+            a_sender = self.contains_sender_code_series(a_raw)
+            b_sender = self.contains_sender_code_series(b_raw)
+            Raw['Counterparty'] = np.select(
+                [
+                    is_sms & b_sender,
+                    is_sms & a_sender,
+                    a_num.eq(t) & b_num.ne(""),
+                    b_num.eq(t) & a_num.ne(""),
+                    b_num.ne(""),
+                    a_num.ne(""),
+                    b_raw.ne(""),
+                ],
+                [b_raw, a_raw, b_num, a_num, b_num, a_num, b_raw],
+                default=a_raw,
+            )
 
-            Raw['CALL_DATE'] = Raw['DateObj'].apply(lambda d: d.strftime("%Y-%m-%d") if pd.notna(d) else "")
-            Raw['CALL_TIME'] = Raw['TimeObj'].apply(lambda t: t.strftime("%H:%M:%S") if pd.notna(t) else "")
-            Raw['IsNight'] = Raw['start_dt'].dt.hour.apply(self.is_night_hour)
+            # ✅ formatted once per distinct date / time of day
+            Raw['CALL_DATE'] = self.map_distinct(dates, lambda d: d.dt.strftime("%Y-%m-%d").fillna(""))
+            Raw['CALL_TIME'] = self.map_distinct(times, lambda t: t.dt.strftime("%H:%M:%S").fillna(""))
+            hour = Raw['start_dt'].dt.hour
+            Raw['IsNight'] = self.is_night_series(hour)
 
-            # ✅ Build standardized output (convert mixed types to str just for output)
+            # ✅ Build standardized output (ID and number columns are already text, "" for blanks)
+            # 🔑 copy=False: columns keep their arrays, so both counterparty columns share one backing array
             std = pd.DataFrame({
                 'CDR Party No': Raw['CdrNo'],
                 'Opposite Party No': Raw['Counterparty'],
@@ -278,29 +501,29 @@ class CDRProcessor:
                 'CALL_TIME': Raw['CALL_TIME'],
                 'CallTypeStd': Raw['CallTypeStd'],
                 'CALL_DURATION': Raw['CALL_DURATION'],
-                'FIRST_CELL_ID_A': Raw['FirstCellID'].astype(str),
+                'FIRST_CELL_ID_A': Raw['FirstCellID'],
                 'First_Cell_Site_Address': Raw['FirstCellAddr'],
                 'First_Cell_Site_Name-City': Raw['FirstCellCity'],
                 'First_Lat_Long': Raw['FirstLatLong'],
-                'LAST_CELL_ID_A': Raw['LastCellID'].astype(str),
+                'LAST_CELL_ID_A': Raw['LastCellID'],
                 'Last_Cell_Site_Address': Raw['LastCellAddr'],
                 'Last_Cell_Site_Name-City': Raw['LastCellCity'],
                 'Last_Lat_Long': Raw['LastLatLong'],
-                'ESN_IMEI_A': Raw['IMEI'].astype(str),
-                'IMSI_A': Raw['IMSI'].astype(str),
+                'ESN_IMEI_A': Raw['IMEI'],
+                'IMSI_A': Raw['IMSI'],
                 'CUST_TYPE': "",
                 'SMSC_CENTER': Raw['SMSC'],
                 'Home Circle': Raw['HomeCircle'],
                 'ROAM_CIRCLE': Raw['Circle'],
                 'Opp Party-Activation Date': "",
                 'Opp Party-Service Provider': Raw['operator'],
-                'ID': pd.RangeIndex(start=1, stop=len(Raw)+1).astype(int)
-            })
-
-            std['start_dt'] = Raw['start_dt']
-            std['IsNight'] = Raw['IsNight']
-            std['DurationSeconds'] = Raw['CALL_DURATION']
-            return std.reset_index(drop=True)
+                'ID': source.groupby(source, sort=False).cumcount() + 1,
+                'start_dt': Raw['start_dt'],
+                'IsNight': Raw['IsNight'],
+                'DurationSeconds': Raw['CALL_DURATION'],
+            }, copy=False)
+            std.index = pd.RangeIndex(len(std))  # relabel only; reset_index(drop=True) copied every column
+            return std
 
         except Exception as e:
             logging.error(f"Error standardizing rows: {e}")
@@ -309,13 +532,35 @@ class CDRProcessor:
     def process_files(self, file_paths):
         try:
             self.update_progress(5, "Starting processing files...")
-            all_dfs = []
-            for i, p in enumerate(file_paths):
-                if self.cancel_flag: raise Exception("Cancelled")
-                raw = self.load_csv_file(p)
-                std = self.standardize_rows(raw)
-                all_dfs.append(std)
-            combined = pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+            # 🔑 files parse side by side (the C parser releases the GIL); frames stay in input order
+            total = len(file_paths)
+            frames = [None] * total
+            with ThreadPoolExecutor(max_workers=max(1, min(LOAD_WORKERS, total))) as pool:
+                futures = {pool.submit(self.load_file_frame, p, i): i for i, p in enumerate(file_paths)}
+                try:
+                    for done, future in enumerate(as_completed(futures), start=1):
+                        i = futures[future]
+                        frames[i] = future.result()
+                        self.update_progress(20 + 5 * done // total, f"Loaded {os.path.basename(file_paths[i])}: "
+                                                                     f"{len(frames[i])} rows ({done}/{total} files)")
+                except BaseException:
+                    for f in futures:
+                        f.cancel()  # a failed or cancelled file stops the ones not started yet
+                    raise
+            # 🔑 one standardize pass over every file instead of one per file (a single file is used as-is, no copy)
+            if len(frames) > 1:
+                combined = self.standardize_rows(pd.concat(frames, ignore_index=True))
+            elif frames:
+                combined = self.standardize_rows(frames[0])
+            else:
+                combined = pd.DataFrame()
+            # ✅ Categorise after the concat so every file shares one set of categories
+            for c in CATEGORY_COLUMNS:
+                if c in combined.columns:
+                    combined[c] = combined[c].fillna("").astype("category")
+            for c in SITE_CATEGORY_COLUMNS:
+                if c in combined.columns:
+                    combined[c] = combined[c].astype("category")
             self.update_progress(100, f"Processing complete: {len(combined)} records")
             return combined
         except Exception as e:
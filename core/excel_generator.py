@@ -1,20 +1,53 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import os
 import re
 import logging
-from datetime import date
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+try:
+    import xlsxwriter  # optional: faster constant-memory writer
+except ImportError:
+    xlsxwriter = None
+
+_RE_DIGIT = re.compile(r"\d")
+
+# sheet styling shared by both writers (RGB hex)
+TAB_COLORS = [
+    "92D050", "4472C4", "ED7D31", "7030A0", "C00000",
+    "00B0F0", "FFC000", "548235", "2E75B6"
+]
+IMP_HEADER_COLOR = "305496"     # dark blue
+HEADER_COLOR = "4472C4"         # lighter blue
+ALT_ROW_COLOR = "F2F2F2"
+HIGHLIGHT_COLOR = "ADD8E6"      # light blue
+BORDER_COLOR = "999999"
+DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+
+EVENT_COLUMNS = [
+    "Total Event", "Call In", "Call Out", "SMS In", "SMS Out",
+    "Call In_Duration", "Call Out_Duration", "Total_Duration"
+]
+# sheets built ahead of the one being written; each finished sheet frame is held until it is written
+SHEETS_BUILT_AHEAD = 2
+
+# ✅ CallTypeStd values counted by event_summary, in EVENT_COLUMNS order
+EVENT_CALL_TYPES = ["CALL_IN", "CALL_OUT", "SMS_IN", "SMS_OUT"]
+
 
 class ExcelGenerator:
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, parallel=True):
         self.progress_callback = progress_callback
         self.cancel_flag = False
+        self.parallel = parallel  # build SHEETS_BUILT_AHEAD sheets side by side; False builds one ahead
 
     def set_cancel_flag(self):
         self.cancel_flag = True
@@ -31,82 +64,226 @@ class ExcelGenerator:
     # -------------------------
     # Autofit and Styling
     # -------------------------
-    def autofit_and_style(self, workbook, sheet_name, important_headers, sheet_index=0):
-        try:
-            ws = workbook[sheet_name]
-            max_row = ws.max_row
-            max_col = ws.max_column
-
-            # --- Tab colors palette ---
-            tab_colors = [
-                "92D050", "4472C4", "ED7D31", "7030A0", "C00000",
-                "00B0F0", "FFC000", "548235", "2E75B6"
-            ]
-            ws.sheet_properties.tabColor = tab_colors[sheet_index % len(tab_colors)]
-
-            # Freeze top row and first column
-            ws.freeze_panes = "B2"
-
-            # --- Styles ---
-            header_font = Font(bold=True, color="FFFFFF")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            imp_fill = PatternFill(start_color="FF305496", end_color="FF305496", fill_type="solid")   # dark blue
-            normal_fill = PatternFill(start_color="FF4472C4", end_color="FF4472C4", fill_type="solid")  # lighter blue
-            alt_fill = PatternFill(start_color="FFF2F2F2", end_color="FFF2F2F2", fill_type="solid")
-            highlight_fill = PatternFill(start_color="FFADD8E6", fill_type="solid")  # light blue
-            thin = Side(border_style="thin", color="FF999999")
-            border = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-            # --- Headers ---
-            important_indexes = []
-            for col_idx in range(1, max_col + 1):
-                cell = ws.cell(row=1, column=col_idx)
-                header_value = str(cell.value) if cell.value else ""
-
-                cell.font = header_font
-                cell.alignment = header_alignment
-                cell.border = border
-
-                if header_value in important_headers:
-                    cell.fill = imp_fill
-                    important_indexes.append(col_idx)
+    def column_widths(self, df):
+        """Autofit widths from the longest rendered value per column (header included), clamped to 10..50."""
+        widths = []
+        for name in df.columns:
+            col = df[name]
+            if not len(col):
+                longest = 0
+            elif pd.api.types.is_integer_dtype(col):
+                # 🔑 the widest integer is the min or the max, no per-row strings needed
+                longest = max(len(str(col.min())), len(str(col.max())))
+            elif isinstance(col.dtype, pd.CategoricalDtype):
+                # 🔑 measure each category once, then look lengths up by code
+                codes = col.cat.codes.to_numpy()
+                lengths = np.append(col.cat.categories.astype(str).str.len().to_numpy(), len("nan"))
+                longest = int(lengths[codes].max())
+            elif pd.api.types.is_datetime64_any_dtype(col):
+                # every timestamp renders as "%Y-%m-%d %H:%M:%S" (19 chars) and NaT as "", no need to format them
+                longest = 19 if col.notna().any() else 0
+            elif col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) == "string":
+                # 🔑 text columns repeat heavily: render and measure each distinct value (blanks included) once
+                longest = int(pd.Series(pd.unique(col), dtype=object).astype(str).str.len().max())
+            else:
+                if pd.api.types.is_float_dtype(col):
+                    text = col.astype(str).str.removesuffix(".0")  # Excel stores 5.0 as 5
                 else:
-                    cell.fill = normal_fill
-
-            # --- Highlight important columns ---
-            for r in range(2, max_row + 1):
-                for col_idx in important_indexes:
-                    ws.cell(row=r, column=col_idx).fill = highlight_fill
-
-            # --- Alternating row fill for non-important cols ---
-            for r in range(2, max_row + 1):
-                if r % 2 == 0:
-                    for c in range(1, max_col + 1):
-                        if c not in important_indexes:
-                            ws.cell(row=r, column=c).fill = alt_fill
-
-            # --- Autofit columns ---
-            for col in ws.columns:
-                max_length = 0
-                col_letter = get_column_letter(col[0].column)
-                for cell in col:
-                    v = str(cell.value) if cell.value is not None else ""
-                    max_length = max(max_length, len(v))
-                ws.column_dimensions[col_letter].width = min(50, max(10, max_length + 3))
-
-        except Exception as e:
-            logging.warning(f"Styling error on sheet {sheet_name}: {e}")
+                    text = col.astype(str)
+                longest = int(text.str.len().max())
+            longest = max(len(str(name)), longest)
+            widths.append(min(50, max(10, longest + 3)))
+        return widths
+
+    def write_sheet(self, workbook, sheet_name, df, important_headers, sheet_index=0):
+        """Stream df into a write-only sheet, styling each cell as it is written."""
+        ws = workbook.create_sheet(sheet_name)
+
+        ws.sheet_properties.tabColor = TAB_COLORS[sheet_index % len(TAB_COLORS)]
+
+        # Freeze top row and first column
+        ws.freeze_panes = "B2"
+
+        # --- Styles ---
+        solid = lambda rgb: PatternFill(start_color="FF" + rgb, end_color="FF" + rgb, fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF")
+        header_alignment = Alignment(horizontal="center", vertical="center")
+        imp_fill = solid(IMP_HEADER_COLOR)
+        normal_fill = solid(HEADER_COLOR)
+        alt_fill = solid(ALT_ROW_COLOR)
+        highlight_fill = PatternFill(start_color="FF" + HIGHLIGHT_COLOR, fill_type="solid")
+        thin = Side(border_style="thin", color="FF" + BORDER_COLOR)
+        border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+        # --- Autofit columns (must precede rows in write-only mode) ---
+        for col_idx, width in enumerate(self.column_widths(df) or [10], start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        # --- Headers ---
+        headers = [str(c) for c in df.columns] or [""]
+        important = [h in important_headers for h in headers]
+        header_row = []
+        for header_value, is_important in zip(headers, important):
+            cell = WriteOnlyCell(ws, value=header_value or None)
+            cell.font = header_font
+            cell.alignment = header_alignment
+            cell.border = border
+            cell.fill = imp_fill if is_important else normal_fill
+            header_row.append(cell)
+        ws.append(header_row)
+
+        # --- Rows: important columns highlighted, alternating fill for the rest ---
+        date_cols = {i for i, c in enumerate(df.columns) if pd.api.types.is_datetime64_any_dtype(df[c])}
+        values = df.astype(object).where(df.notna(), None)
+        for r, row in enumerate(values.itertuples(index=False, name=None), start=2):
+            row_fill = alt_fill if r % 2 == 0 else None
+            cells = []
+            for i, v in enumerate(row):
+                fill = highlight_fill if important[i] else row_fill
+                is_date = v is not None and i in date_cols
+                if fill is None and not is_date:
+                    cells.append(v)
+                    continue
+                cell = WriteOnlyCell(ws, value=v)
+                if fill is not None:
+                    cell.fill = fill
+                if is_date:
+                    cell.number_format = DATETIME_FORMAT
+                cells.append(cell)
+            ws.append(cells)
+
+    def write_sheet_xlsxwriter(self, workbook, sheet_name, df, important_headers, sheet_index=0):
+        """Same layout and styling as write_sheet, for an xlsxwriter constant_memory workbook."""
+        ws = workbook.add_worksheet(sheet_name)
+        ws.set_tab_color("#" + TAB_COLORS[sheet_index % len(TAB_COLORS)])
+        ws.freeze_panes(1, 1)
+
+        # --- Styles ---
+        header = {"bold": True, "font_color": "#FFFFFF", "align": "center", "valign": "vcenter",
+                  "border": 1, "border_color": "#" + BORDER_COLOR, "pattern": 1}
+        imp_fmt = workbook.add_format({**header, "bg_color": "#" + IMP_HEADER_COLOR})
+        normal_fmt = workbook.add_format({**header, "bg_color": "#" + HEADER_COLOR})
+        formats = {}
+        for fill in (None, HIGHLIGHT_COLOR, ALT_ROW_COLOR):
+            for is_date in (False, True):
+                props = {"pattern": 1, "bg_color": "#" + fill} if fill else {}
+                if is_date:
+                    props["num_format"] = DATETIME_FORMAT
+                formats[fill, is_date] = workbook.add_format(props) if props else None
+
+        # --- Autofit columns (set before rows stream out) ---
+        for col_idx, width in enumerate(self.column_widths(df) or [10]):
+            ws.set_column(col_idx, col_idx, width)
+
+        # --- Headers ---
+        headers = [str(c) for c in df.columns] or [""]
+        important = [h in important_headers for h in headers]
+        for col_idx, (header_value, is_important) in enumerate(zip(headers, important)):
+            ws.write(0, col_idx, header_value or None, imp_fmt if is_important else normal_fmt)
+
+        # --- Rows: important columns highlighted, alternating fill for the rest ---
+        # 🔑 per row parity, neighbouring columns sharing a format go out in one write_row call;
+        # date columns stay single so blank dates keep the plain fill format
+        date_cols = {i for i, c in enumerate(df.columns) if pd.api.types.is_datetime64_any_dtype(df[c])}
+        layouts = {}
+        for parity, row_fill in ((1, ALT_ROW_COLOR), (0, None)):  # Excel rows 2, 4, ... are filled
+            runs = []
+            for i, is_important in enumerate(important[:len(df.columns)]):
+                fill = HIGHLIGHT_COLOR if is_important else row_fill
+                if runs and i not in date_cols and runs[-1][3] is None and runs[-1][2] is formats[fill, False]:
+                    runs[-1][1] = i + 1
+                else:
+                    runs.append([i, i + 1, formats[fill, False], formats[fill, True] if i in date_cols else None])
+            layouts[parity] = runs
+        values = df.astype(object).where(df.notna(), None)
+        for r, row in enumerate(values.itertuples(index=False, name=None), start=1):
+            for start, end, fmt, date_fmt in layouts[r % 2]:
+                if date_fmt is None:
+                    ws.write_row(r, start, row[start:end], fmt)
+                else:
+                    v = row[start]
+                    ws.write(r, start, v, fmt if v is None else date_fmt)
 
     # -------------------------
     # Utility
     # -------------------------
+    def event_summary(self, df, keys):
+        """Event counts and durations per group, from one groupby over indicator columns (keys: names or Series)."""
+        # 🔑 one int8 code per row; other call types get -1, which indexes the all-zero last row of the one-hot table
+        codes = pd.Categorical(df["CallTypeStd"], categories=EVENT_CALL_TYPES).codes
+        onehot = np.eye(len(EVENT_CALL_TYPES) + 1, len(EVENT_CALL_TYPES), dtype="int64")
+        flags = onehot[codes]
+        dur = df["DurationSeconds"].fillna(0).to_numpy(dtype="int64")
+        events = np.column_stack([np.ones(len(df), dtype="int64"), flags, dur * flags[:, 0], dur * flags[:, 1], dur])
+        events = pd.DataFrame(events, columns=EVENT_COLUMNS, index=df.index)
+        by = [df[k] if isinstance(k, str) else k for k in keys]
+        return events.groupby(by, dropna=False, observed=True).sum().astype("int64")
+
+    def event_summary_with_modes(self, df, keys, modes):
+        """event_summary plus each column's group mode (modes: column -> name), all from one groupby over keys + columns."""
+        columns = list(modes)
+        cube = self.event_summary(df, keys + columns)
+        levels = [k if isinstance(k, str) else k.name for k in keys]
+        summary = cube.groupby(level=levels, dropna=False, observed=True).sum()
+        for column, name in modes.items():
+            counts = cube["Total Event"].groupby(level=levels + [column], dropna=False, observed=True).sum()
+            summary[name] = self._mode_from_counts(counts.rename("_n").reset_index(), levels, column)
+        return summary
+
+    def _mode_from_counts(self, counts, keys, column):
+        """Most frequent column value per group ("" if a group has none), ties to the smallest like Series.mode."""
+        counts = counts.copy()
+        counts.loc[counts[column].isna(), "_n"] = 0
+        counts = counts.sort_values(keys + ["_n", column], ascending=[True] * len(keys) + [False, True])
+        mode = counts.drop_duplicates(keys).set_index(keys)[column]
+        mode = mode.astype(object)
+        return mode.where(mode.notna(), "")
+
+    def first_names(self, df, keys, index, groups=None):
+        """Opp Party-Name of each group's first row (NaN kept), or the opposite number when the column is missing."""
+        if "Opp Party-Name" not in df.columns:
+            return pd.Series([str(k[-1]) for k in index], index=index, dtype=object)
+        if groups is None:
+            groups = df.groupby(keys, dropna=False, observed=True)
+        return groups["Opp Party-Name"].first(skipna=False).reindex(index)
+
+    def group_key(self, col):
+        """col as a categorical with sorted categories (same group order as the text), factorised once for every
+        groupby that keys on it; output columns built from it go back to text with astype(object)."""
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            return col
+        codes, uniques = pd.factorize(col, sort=True)
+        return pd.Series(pd.Categorical.from_codes(codes, uniques), index=col.index, name=col.name)
+
+    def is_blank(self, col):
+        """str(v).strip() == "" per cell, evaluated once per distinct value rather than per row."""
+        codes, uniques = pd.factorize(col, use_na_sentinel=False)
+        blank = np.asarray(pd.Index(uniques).astype(str).str.strip() == "")
+        return pd.Series(blank[codes], index=col.index)
+
+    def call_dates(self, df):
+        """Parsed CALL_DATE (datetime64 days) as df["date_only"]; computed once and shared by every sheet using it."""
+        if "date_only" not in df.columns:
+            # CALL_DATE is always "%Y-%m-%d" or "" (see CDRProcessor), so no format inference per row
+            df["date_only"] = pd.to_datetime(df["CALL_DATE"], format="%Y-%m-%d", errors="coerce")
+        return df["date_only"]
+
     def drop_empty_rows(self, df):
         if df is None or df.empty:
             return df
-        return df.replace(r"^\s*$", np.nan, regex=True).dropna(how="all")
+        # ✅ Blank strings → NaN one column at a time, tested per distinct value (categoricals drop blank categories)
+        df = df.copy(deep=False)
+        for c in df.columns:
+            col = df[c]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                cats = col.cat.categories
+                df[c] = col.cat.remove_categories(cats[cats.astype(str).str.strip() == ""])
+            elif col.dtype == object:
+                df[c] = col.mask(self.is_blank(col))
+        return df.infer_objects().dropna(how="all")
 
     # -------------------------
-    # Sheet creators (all kept as-is)
+    # Sheet creators
     # -------------------------
     def create__01_CDR_Format(self, df):
         if df is None or df.empty:
@@ -123,111 +300,64 @@ class ExcelGenerator:
             "First_Cell_Site_Name-City", "First_Lat_Long", "LAST_CELL_ID_A", "Last_Cell_Site_Address",
             "Last_Cell_Site_Name-City", "Last_Lat_Long", "ESN_IMEI_A", "IMSI_A", "CUST_TYPE", "SMSC_CENTER",
             "Home Circle", "ROAM_CIRCLE", "Opp Party-Activation Date", "Opp Party-Service Provider", "ID"
-        ]].copy()
+        ]]
         return out.rename(columns={"CallTypeStd": "Call_Type_Std"})
 
     def create__02_Relationship_Call_Frequ(self, df):
+        columns = [
+            "ID", "CDR Party No", "Opposite Party No", "Opp Party-SP State",
+            "Opp Party-Name", "Opp Party-Full Address", "Start_Date", "End_Date",
+            "Date_Diff"
+        ] + EVENT_COLUMNS
         if df is None or df.empty:
-            return pd.DataFrame(columns=[
-                "ID", "CDR Party No", "Opposite Party No", "Opp Party-SP State",
-                "Opp Party-Name", "Opp Party-Full Address", "Start_Date", "End_Date",
-                "Date_Diff", "Total Event", "Call In", "Call Out", "SMS In", "SMS Out",
-                "Call In_Duration", "Call Out_Duration", "Total_Duration"
-            ])
-
-        df["date_only"] = pd.to_datetime(df["CALL_DATE"], errors="coerce").dt.date
-        grp = df.groupby(["CDR Party No", "Opposite Party No"], dropna=False)
-
-        rows = []
-        idx = 1
-
-        for (cdr, opp), g in grp:
-            if str(opp).strip() == "":
-                continue
+            return pd.DataFrame(columns=columns)
 
-            valid_dates = [d for d in g["date_only"] if isinstance(d, date) and pd.notna(d)]
-            if valid_dates:
-                start = min(valid_dates)
-                end = max(valid_dates)
-                date_diff = (end - start).days
-            else:
-                start = None
-                end = None
-                date_diff = 0
-
-            rows.append({
-                "ID": idx,
-                "CDR Party No": cdr,
-                "Opposite Party No": opp,
-                "Opp Party-SP State": g["ROAM_CIRCLE"].mode().iat[0]
-                    if not g["ROAM_CIRCLE"].replace("", np.nan).dropna().empty else "",
-                "Opp Party-Name": g["Opp Party-Name"].iloc[0]
-                    if "Opp Party-Name" in g.columns else str(opp),
-                "Opp Party-Full Address": "",
-                "Start_Date": start.strftime("%Y-%m-%d") if start else "",
-                "End_Date": end.strftime("%Y-%m-%d") if end else "",
-                "Date_Diff": date_diff,
-                "Total Event": len(g),
-                "Call In": int((g["CallTypeStd"] == "CALL_IN").sum()),
-                "Call Out": int((g["CallTypeStd"] == "CALL_OUT").sum()),
-                "SMS In": int((g["CallTypeStd"] == "SMS_IN").sum()),
-                "SMS Out": int((g["CallTypeStd"] == "SMS_OUT").sum()),
-                "Call In_Duration": int(g.loc[g["CallTypeStd"] == "CALL_IN", "DurationSeconds"].sum()),
-                "Call Out_Duration": int(g.loc[g["CallTypeStd"] == "CALL_OUT", "DurationSeconds"].sum()),
-                "Total_Duration": int(g["DurationSeconds"].sum())
-            })
-            idx += 1
-
-        result_df = pd.DataFrame(rows)
+        # 🔑 the opposite number is factorised here, once, for this sheet's groupbys (it stays text in df)
+        keys = [df["CDR Party No"], self.group_key(df["Opposite Party No"])]
+        self.call_dates(df)
+        # 🔑 one grouper, factorised once, for both the date span and the first name
+        groups = df.groupby(keys, dropna=False, observed=True)
+        pairs = groups["date_only"].agg(["min", "max"])
+        pairs["name"] = self.first_names(df, keys, pairs.index, groups)
+        pairs = pairs.reset_index()
+        pairs = pairs[~self.is_blank(pairs["Opposite Party No"])].reset_index(drop=True)
+
+        # 🔑 dates formatted column-wide; End_Date stays a timestamp for the sort below
+        start, end = pairs["min"], pairs["max"]
+        summary = self.event_summary_with_modes(df, keys, {"ROAM_CIRCLE": "Opp Party-SP State"})
+        result_df = pd.DataFrame({
+            "ID": range(1, len(pairs) + 1),
+            "CDR Party No": pairs["CDR Party No"],
+            "Opposite Party No": pairs["Opposite Party No"],
+            "Opp Party-Name": pairs["name"],
+            "Opp Party-Full Address": "",
+            "Start_Date": start.dt.strftime("%Y-%m-%d").fillna(""),
+            "End_Date": end,
+            "Date_Diff": (end - start).dt.days.fillna(0).astype("int64")
+        }).join(summary, on=["CDR Party No", "Opposite Party No"])[columns]
+        result_df["Opposite Party No"] = result_df["Opposite Party No"].astype(object)
 
         # 🔑 Sort by End_Date descending
         if not result_df.empty:
-            result_df["End_Date"] = pd.to_datetime(result_df["End_Date"], errors="coerce")
             result_df = result_df.sort_values(by="End_Date", ascending=False, na_position='last')
 
         return result_df
 
     def create__03_Cell_ID_Frequency(self, df):
+        columns = [
+            "Id", "CDR Party No", "FIRST_CELL_ID_A", "First_Cell_Site_Address",
+            "First_Lat_Long"
+        ] + EVENT_COLUMNS + ["ROAM_CIRCLE", "First_Cell_Site_Name-City"]
         if df is None or df.empty:
-            return pd.DataFrame(columns=[
-                "Id", "CDR Party No", "FIRST_CELL_ID_A", "First_Cell_Site_Address",
-                "First_Lat_Long", "Total Event", "Call In", "Call Out", "SMS In", "SMS Out",
-                "Call In_Duration", "Call Out_Duration", "Total_Duration", "ROAM_CIRCLE",
-                "First_Cell_Site_Name-City"
-            ])
+            return pd.DataFrame(columns=columns)
 
-        grp = df.groupby(["CDR Party No", "FIRST_CELL_ID_A"], dropna=False)
-        rows = []
-        idx = 1
-
-        for (cdr, cell), g in grp:
-            if str(cell).strip() == "":
-                continue
-
-            rows.append({
-                "Id": idx,
-                "CDR Party No": cdr,
-                "FIRST_CELL_ID_A": cell,
-                "First_Cell_Site_Address": g["First_Cell_Site_Address"].mode().iat[0]
-                    if not g["First_Cell_Site_Address"].replace("", np.nan).dropna().empty else "",
-                "First_Lat_Long": g["First_Lat_Long"].mode().iat[0]
-                    if not g["First_Lat_Long"].replace("", np.nan).dropna().empty else "",
-                "Total Event": len(g),
-                "Call In": int((g["CallTypeStd"] == "CALL_IN").sum()),
-                "Call Out": int((g["CallTypeStd"] == "CALL_OUT").sum()),
-                "SMS In": int((g["CallTypeStd"] == "SMS_IN").sum()),
-                "SMS Out": int((g["CallTypeStd"] == "SMS_OUT").sum()),
-                "Call In_Duration": int(g.loc[g["CallTypeStd"] == "CALL_IN", "DurationSeconds"].sum()),
-                "Call Out_Duration": int(g.loc[g["CallTypeStd"] == "CALL_OUT", "DurationSeconds"].sum()),
-                "Total_Duration": int(g["DurationSeconds"].sum()),
-                "ROAM_CIRCLE": g["ROAM_CIRCLE"].mode().iat[0]
-                    if not g["ROAM_CIRCLE"].replace("", np.nan).dropna().empty else "",
-                "First_Cell_Site_Name-City": g["First_Cell_Site_Name-City"].mode().iat[0]
-                    if not g["First_Cell_Site_Name-City"].replace("", np.nan).dropna().empty else ""
-            })
-            idx += 1
-
-        result_df = pd.DataFrame(rows)
+        keys = ["CDR Party No", "FIRST_CELL_ID_A"]
+        # 🔑 counts and all four modes from a single pass over the rows
+        mode_columns = ("First_Cell_Site_Address", "First_Lat_Long", "ROAM_CIRCLE", "First_Cell_Site_Name-City")
+        result_df = self.event_summary_with_modes(df, keys, {c: c for c in mode_columns}).reset_index()
+        result_df = result_df[~self.is_blank(result_df["FIRST_CELL_ID_A"])]
+        result_df.insert(0, "Id", range(1, len(result_df) + 1))
+        result_df = result_df[columns]
 
         # 🔑 Sort by Total Event descending
         if not result_df.empty:
@@ -250,53 +380,39 @@ class ExcelGenerator:
             "CDR Party No", "Opposite Party No", "CALL_DATE", "CALL_TIME",
             "FIRST_CELL_ID_A", "First_Cell_Site_Name-City",
             "First_Cell_Site_Address", "First_Lat_Long"
-        ]].copy()
+        ]]
 
         out.insert(0, "ID", range(1, len(out) + 1))
         return out
 
     def create__05_Imei_Used(self, df):
+        columns = [
+            "ID", "CDR Party No", "CDR Party-Name", "CDR Party-Full Address",
+            "CDR Party-Service Provider", "IMEI", "First_Call", "Last_call"
+        ] + EVENT_COLUMNS
         if df is None or df.empty:
-            return pd.DataFrame(columns=[
-                "ID", "CDR Party No", "CDR Party-Name", "CDR Party-Full Address",
-                "CDR Party-Service Provider", "IMEI", "First_Call", "Last_call",
-                "Total Event", "Call In", "Call Out", "SMS In", "SMS Out",
-                "Call In_Duration", "Call Out_Duration", "Total_Duration"
-            ])
+            return pd.DataFrame(columns=columns)
 
-        grp = df[df["ESN_IMEI_A"].astype(str).str.strip() != ""].groupby(
-            ["CDR Party No", "ESN_IMEI_A"], dropna=False
-        )
-
-        rows = []
-        idx = 1
-
-        for (cdr, imei), g in grp:
-            first_dt = g["start_dt"].min()
-            last_dt = g["start_dt"].max()
-
-            rows.append({
-                "ID": idx,
-                "CDR Party No": cdr,
-                "CDR Party-Name": "",
-                "CDR Party-Full Address": "",
-                "CDR Party-Service Provider": g["Opp Party-Service Provider"].mode().iat[0]
-                    if "Opp Party-Service Provider" in g.columns and not g["Opp Party-Service Provider"].replace("", np.nan).dropna().empty else "",
-                "IMEI": imei,
-                "First_Call": first_dt.strftime("%Y-%m-%d %H:%M:%S") if pd.notna(first_dt) else "",
-                "Last_call": last_dt.strftime("%Y-%m-%d %H:%M:%S") if pd.notna(last_dt) else "",
-                "Total Event": len(g),
-                "Call In": int((g["CallTypeStd"] == "CALL_IN").sum()),
-                "Call Out": int((g["CallTypeStd"] == "CALL_OUT").sum()),
-                "SMS In": int((g["CallTypeStd"] == "SMS_IN").sum()),
-                "SMS Out": int((g["CallTypeStd"] == "SMS_OUT").sum()),
-                "Call In_Duration": int(g.loc[g["CallTypeStd"] == "CALL_IN", "DurationSeconds"].sum()),
-                "Call Out_Duration": int(g.loc[g["CallTypeStd"] == "CALL_OUT", "DurationSeconds"].sum()),
-                "Total_Duration": int(g["DurationSeconds"].sum())
-            })
-            idx += 1
-
-        return pd.DataFrame(rows)
+        with_imei = df[~self.is_blank(df["ESN_IMEI_A"])]
+        keys = ["CDR Party No", "ESN_IMEI_A"]
+        span = with_imei.groupby(keys, dropna=False, observed=True)["start_dt"].agg(["min", "max"]).reset_index()
+        result_df = pd.DataFrame({
+            "ID": range(1, len(span) + 1),
+            "CDR Party No": span["CDR Party No"],
+            "CDR Party-Name": "",
+            "CDR Party-Full Address": "",
+            "IMEI": span["ESN_IMEI_A"],
+            "First_Call": span["min"].dt.strftime("%Y-%m-%d %H:%M:%S").fillna(""),
+            "Last_call": span["max"].dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+        })
+
+        if "Opp Party-Service Provider" in with_imei.columns:
+            summary = self.event_summary_with_modes(
+                with_imei, keys, {"Opp Party-Service Provider": "CDR Party-Service Provider"})
+        else:
+            summary = self.event_summary(with_imei, keys)
+            summary["CDR Party-Service Provider"] = ""
+        return result_df.join(summary, on=["CDR Party No", "IMEI"])[columns]
 
     def create__06_State_Connection(self, df):
         columns = [
@@ -305,8 +421,6 @@ class ExcelGenerator:
             "Call In_Duration", "Call Out_Duration", "Total_Duration"
         ]
 
-        rows = []  # Always define rows
-
         if df is None or df.empty:
             return pd.DataFrame(columns=columns)
 
@@ -344,43 +458,29 @@ class ExcelGenerator:
             return state_map.get(v, v)
 
         try:
-            df["ConnectionState"] = (
-                df["Home Circle"].fillna("")
-                .replace("", np.nan)
-                .fillna(df["ROAM_CIRCLE"].fillna(""))
-                .map(normalize_state)
-            )
-
-            grp = df.groupby(["CDR Party No", "ConnectionState"], dropna=False)
-            idx = 1
-
-            for (cdr, state), g in grp:
-                if pd.isna(state) or str(state).strip() == "":
-                    continue
-
-                rows.append({
-                    "Id": idx,
-                    "CDR Party No": cdr,
-                    "Connection of State": state,
-                    "Total Event": len(g),
-                    "Call In": int((g["CallTypeStd"] == "CALL_IN").sum()),
-                    "Call Out": int((g["CallTypeStd"] == "CALL_OUT").sum()),
-                    "SMS In": int((g["CallTypeStd"] == "SMS_IN").sum()),
-                    "SMS Out": int((g["CallTypeStd"] == "SMS_OUT").sum()),
-                    "Call In_Duration": int(g.loc[g["CallTypeStd"] == "CALL_IN", "DurationSeconds"].sum()),
-                    "Call Out_Duration": int(g.loc[g["CallTypeStd"] == "CALL_OUT", "DurationSeconds"].sum()),
-                    "Total_Duration": int(g["DurationSeconds"].sum())
-                })
-                idx += 1
+            home = df["Home Circle"].astype(object).fillna("")
+            roam = df["ROAM_CIRCLE"].astype(object).fillna("")
+            # 🔑 home circle unless blank, then normalize_state once per distinct circle instead of per row
+            codes, uniques = pd.factorize(home.where(home.ne(""), roam), use_na_sentinel=False)
+            # 🔑 grouped as a categorical (sorted categories keep the string group order), so codes are hashed, not text
+            state_codes, states = pd.factorize(np.array([normalize_state(u) for u in uniques], dtype=object), sort=True)
+            connection = pd.Series(pd.Categorical.from_codes(state_codes[codes], states), index=df.index,
+                                   name="ConnectionState")
+
+            summary = self.event_summary(df, ["CDR Party No", connection]).reset_index()
+            state = summary["ConnectionState"]
+            summary = summary[state.notna() & ~self.is_blank(state)]
+            summary = summary.rename(columns={"ConnectionState": "Connection of State"})
+            summary["Connection of State"] = summary["Connection of State"].astype(object)
+            summary.insert(0, "Id", range(1, len(summary) + 1))
 
         except Exception as e:
             print("❌ ERROR in create__06_State_Connection:", e)
             return pd.DataFrame(columns=columns)
 
-    # Always return a DataFrame — even if rows is empty
-        return pd.DataFrame(rows, columns=columns).sort_values(
-        by=["Total Event"], ascending=False
-    ).reset_index(drop=True)
+        return summary[columns].sort_values(
+            by=["Total Event"], ascending=False
+        ).reset_index(drop=True)
 
     def create__07_ISD_Call(self, df):
         if df is None or df.empty:
@@ -390,16 +490,14 @@ class ExcelGenerator:
                 "Last Cell ID Address", "IMEI", "IMSI", "Roaming", "Operator"
             ])
 
-        def is_international(number):
-            if pd.isna(number) or str(number).strip() == "":
-                return False
-            s = str(number).strip()
-            num_clean = re.sub(r"\D", "", s)
-            return s.startswith("+") or s.startswith("00") or (len(num_clean) > 12)
-
-        calls = df[df["CallTypeStd"].str.startswith("CALL")].copy()
-        calls["IsISD"] = calls["Opposite Party No"].apply(is_international)
-        isd = calls[calls["IsISD"]]
+        calls = df[df["CallTypeStd"].str.startswith("CALL")]
+        # 🔑 international: "+" / "00" prefix or more than 12 digits, tested once per distinct number
+        codes, uniques = pd.factorize(calls["Opposite Party No"], use_na_sentinel=False)
+        opp = pd.Series(uniques, dtype=object)
+        opp = opp.astype(str).str.strip().where(opp.notna(), "")
+        longer = opp.str.len() > 12  # only these can hold more than 12 digits
+        international = opp.str.startswith(("+", "00")) | (longer & opp.str.count(_RE_DIGIT).gt(12))
+        isd = calls[international.to_numpy(dtype=bool)[codes]]
 
         if isd.empty:
             return pd.DataFrame(columns=[
@@ -413,9 +511,7 @@ class ExcelGenerator:
             "CALL_DURATION", "FIRST_CELL_ID_A", "First_Cell_Site_Address",
             "LAST_CELL_ID_A", "Last_Cell_Site_Address", "ESN_IMEI_A", "IMSI_A",
             "ROAM_CIRCLE", "Opp Party-Service Provider"
-        ]].copy()
-
-        out = out.rename(columns={
+        ]].rename(columns={
             "Opposite Party No": "B Party",
             "CALL_DATE": "Date",
             "CALL_TIME": "Time",
@@ -436,45 +532,29 @@ class ExcelGenerator:
         return out.reset_index(drop=True)
 
     def create__08_Night_Call(self, df):
+        columns = [
+            "Id", "CDR Party No", "Opposite Party No", "Opp Party-Name",
+            "Opp Party-Full Address", "Opp Party-SP State"
+        ] + EVENT_COLUMNS
         if df is None or df.empty:
-            return pd.DataFrame(columns=[
-                "Id", "CDR Party No", "Opposite Party No", "Opp Party-Name",
-                "Opp Party-Full Address", "Opp Party-SP State", "Total Event",
-                "Call In", "Call Out", "SMS In", "SMS Out",
-                "Call In_Duration", "Call Out_Duration", "Total_Duration"
-            ])
+            return pd.DataFrame(columns=columns)
 
-        night = df[df["IsNight"] == True].copy()
-        grp = night.groupby(["CDR Party No", "Opposite Party No"], dropna=False)
-
-        rows = []
-        idx = 1
-
-        for (cdr, opp), g in grp:
-            if str(opp).strip() == "":
-                continue
-
-            rows.append({
-                "Id": idx,
-                "CDR Party No": cdr,
-                "Opposite Party No": opp,
-                "Opp Party-Name": g["Opp Party-Name"].iloc[0]
-                    if "Opp Party-Name" in g.columns else str(opp),
-                "Opp Party-Full Address": "",
-                "Opp Party-SP State": g["ROAM_CIRCLE"].mode().iat[0]
-                    if not g["ROAM_CIRCLE"].replace("", np.nan).dropna().empty else "",
-                "Total Event": len(g),
-                "Call In": int((g["CallTypeStd"] == "CALL_IN").sum()),
-                "Call Out": int((g["CallTypeStd"] == "CALL_OUT").sum()),
-                "SMS In": int((g["CallTypeStd"] == "SMS_IN").sum()),
-                "SMS Out": int((g["CallTypeStd"] == "SMS_OUT").sum()),
-                "Call In_Duration": int(g.loc[g["CallTypeStd"] == "CALL_IN", "DurationSeconds"].sum()),
-                "Call Out_Duration": int(g.loc[g["CallTypeStd"] == "CALL_OUT", "DurationSeconds"].sum()),
-                "Total_Duration": int(g["DurationSeconds"].sum())
-            })
-            idx += 1
-
-        result_df = pd.DataFrame(rows)
+        night = df[df["IsNight"] == True]
+        keys = [night["CDR Party No"], self.group_key(night["Opposite Party No"])]
+        summary = self.event_summary_with_modes(night, keys, {"ROAM_CIRCLE": "Opp Party-SP State"})
+        names = self.first_names(night, keys, summary.index)
+
+        # 🔑 columns straight from the group index, blank opposite numbers dropped
+        pairs = names.rename("name").reset_index()
+        pairs = pairs[~self.is_blank(pairs["Opposite Party No"])].reset_index(drop=True)
+        result_df = pd.DataFrame({
+            "Id": range(1, len(pairs) + 1),
+            "CDR Party No": pairs["CDR Party No"],
+            "Opposite Party No": pairs["Opposite Party No"],
+            "Opp Party-Name": pairs["name"],
+            "Opp Party-Full Address": ""
+        }).join(summary, on=["CDR Party No", "Opposite Party No"])[columns]
+        result_df["Opposite Party No"] = result_df["Opposite Party No"].astype(object)
 
         # 🔑 Sort by Total Event descending
         if not result_df.empty:
@@ -488,32 +568,28 @@ class ExcelGenerator:
         if df is None or df.empty:
             return pd.DataFrame(columns=["ID", "Start_Date", "End_Date", "Total_Day"])
 
-        df["date_only"] = pd.to_datetime(df["CALL_DATE"], errors="coerce").dt.date
-        grp = df.groupby(["CDR Party No"], dropna=False)
-        rows = []
-        idx = 1
-
-        for cdr, g in grp:
-            # Only use valid dates
-            dates = [d for d in g["date_only"] if isinstance(d, date) and pd.notna(d)]
-            if not dates:
-                continue
-
-            dates = sorted(set(dates))
-            for i in range(len(dates) - 1):
-                gap = (dates[i + 1] - dates[i]).days
-                if gap > 1:
-                    rows.append({
-                        "ID": idx,
-                        "Start_Date": dates[i].strftime("%Y-%m-%d")
-                            if (dates[i] and pd.notna(dates[i]) and isinstance(dates[i], date)) else "",
-                        "End_Date": dates[i + 1].strftime("%Y-%m-%d")
-                            if (dates[i + 1] and pd.notna(dates[i + 1]) and isinstance(dates[i + 1], date)) else "",
-                        "Total_Day": gap
-                    })
-                    idx += 1
-
-        return pd.DataFrame(rows)
+        # 🔑 one sorted frame of distinct (party, day) pairs; each party is a contiguous run,
+        # so the next day comes from a plain shift cut at the run boundaries (no groupby)
+        days = pd.DataFrame({
+            "cdr": df["CDR Party No"],
+            "day": self.call_dates(df)
+        }).dropna(subset=["day"]).drop_duplicates()
+        days = days.sort_values(["cdr", "day"], na_position="last")
+        codes = pd.factorize(days["cdr"], use_na_sentinel=False)[0]
+        same_party = np.zeros(len(codes), dtype=bool)
+        same_party[:-1] = codes[1:] == codes[:-1]
+        next_day = days["day"].shift(-1).where(same_party)
+        gap = (next_day - days["day"]).dt.days
+        off = gap > 1
+        if not off.any():
+            return pd.DataFrame()
+
+        return pd.DataFrame({
+            "ID": range(1, int(off.sum()) + 1),
+            "Start_Date": days["day"][off].dt.strftime("%Y-%m-%d").to_numpy(),
+            "End_Date": next_day[off].dt.strftime("%Y-%m-%d").to_numpy(),
+            "Total_Day": gap[off].astype("int64").to_numpy()
+        })
 
     # -------------------------
     # Main generate function
@@ -543,20 +619,54 @@ class ExcelGenerator:
                  ["Start_Date", "End_Date", "Total_Day"])
             ]
 
-            with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-                for sheet_name, creator, imp_cols in sheet_defs:
-                    if self.cancel_flag:
-                        raise Exception("Cancelled")
-                    self.update_progress(50, f"Generating {sheet_name}")
-                    sheet_df = creator(df)
-                    sheet_df = self.drop_empty_rows(sheet_df)
-                    sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # styling pass
-            wb = load_workbook(output_path)
-            for idx, (sheet_name, _, imp_cols) in enumerate(sheet_defs):
-                self.autofit_and_style(wb, sheet_name, imp_cols, sheet_index=idx)
-            wb.save(output_path)
+            # builders only read df from here on, so they can run side by side
+            if df is not None and not df.empty:
+                self.call_dates(df)
+            build = lambda creator: self.drop_empty_rows(creator(df))
+
+            # 🔑 streaming workbook: rows are styled as they are written, no reload pass.
+            # xlsxwriter (constant_memory) when installed, else openpyxl write-only.
+            if xlsxwriter is not None:
+                wb = xlsxwriter.Workbook(output_path, {"constant_memory": True, "strings_to_urls": False})
+                write_sheet = self.write_sheet_xlsxwriter
+            else:
+                wb = Workbook(write_only=True)
+                write_sheet = self.write_sheet
+            ahead = SHEETS_BUILT_AHEAD if self.parallel else 1
+            written = False
+            try:
+                with ThreadPoolExecutor(max_workers=ahead) as pool:
+                    # 🔑 a bounded window: the next builder starts only as a sheet is taken for writing,
+                    # so at most `ahead` finished frames wait beside the one being written
+                    pending = deque(pool.submit(build, creator) for _, creator, _ in sheet_defs[:ahead])
+                    try:
+                        for idx, (sheet_name, _, imp_cols) in enumerate(sheet_defs):
+                            if self.cancel_flag:
+                                raise Exception("Cancelled")
+                            self.update_progress(50, f"Generating {sheet_name}")
+                            sheet = pending.popleft().result()
+                            if idx + ahead < len(sheet_defs):
+                                pending.append(pool.submit(build, sheet_defs[idx + ahead][1]))
+                            write_sheet(wb, sheet_name, sheet, imp_cols, sheet_index=idx)
+                            del sheet  # released before waiting on the next one
+                    except BaseException:
+                        for f in pending:
+                            f.cancel()  # builders not yet started are skipped
+                        raise
+                written = True
+            finally:
+                # 🔑 closed on every path: closing is what removes the writers' per-sheet temp files
+                try:
+                    if xlsxwriter is not None:
+                        wb.close()
+                    else:
+                        wb.save(output_path)
+                except Exception as e:
+                    if written:
+                        raise
+                    logging.warning(f"Could not close unfinished workbook {output_path}: {e}")
+                if not written and os.path.exists(output_path):
+                    os.remove(output_path)  # a cancelled or failed run leaves no half-written workbook
 
             self.update_progress(100, f"Excel generated: {output_path}")
             return output_path
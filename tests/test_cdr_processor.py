@@ -0,0 +1,134 @@
+import os
+import sys
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import cdr_processor
+from core.cdr_processor import CDRProcessor
+
+
+class TextToSecondsTest(unittest.TestCase):
+    def test_plain_seconds_without_warnings(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            secs = CDRProcessor()._text_to_seconds(pd.Series(["12", "30", "7"]))
+        self.assertEqual(secs.tolist(), [12, 30, 7])
+        self.assertEqual(secs.dtype, "int64")
+
+    def test_mixed_formats(self):
+        secs = CDRProcessor()._text_to_seconds(pd.Series(["'45", " 1:05 ", "01:02:03", "", "x"]))
+        self.assertEqual(secs.tolist(), [45, 65, 3723, 0, 0])
+
+
+class ParseDatesTest(unittest.TestCase):
+    def parse(self, values):
+        return CDRProcessor().parse_date_series(pd.Series(values, dtype=object))
+
+    def test_iso_dates_are_year_month_day(self):
+        self.assertEqual(self.parse(["2024-02-01", "2023-12-25"]).tolist(),
+                         [pd.Timestamp("2024-02-01"), pd.Timestamp("2023-12-25")])
+
+    def test_slashed_dates_are_day_first(self):
+        self.assertEqual(self.parse(["01/02/2024", "'05/03/2023", "25/12/2023"]).tolist(),
+                         [pd.Timestamp("2024-02-01"), pd.Timestamp("2023-03-05"), pd.Timestamp("2023-12-25")])
+
+    def test_dotted_dates_are_day_first(self):
+        self.assertEqual(self.parse(["01.02.2024", " 05.03.2023 "]).tolist(),
+                         [pd.Timestamp("2024-02-01"), pd.Timestamp("2023-03-05")])
+
+    def test_unparseable_dates_are_missing(self):
+        self.assertTrue(self.parse(["garbage", "", None, "31/02/2024"]).isna().all())
+
+
+def raw_cdr(**columns):
+    """A raw CSV frame of three calls by 9876543210; keyword arguments replace or add columns."""
+    raw = {
+        "Target No": ["9876543210"] * 3,
+        "A Party Number": ["9876543210", "9876543210", "8765432109"],
+        "B Party Number": ["8765432109", "7654321098", "9876543210"],
+        "Date": ["01/02/2024"] * 3,
+        "Time": ["10:00:00"] * 3,
+        "Dur(s)": ["5", "6", "7"],
+        "Service Type": ["Outgoing", "Outgoing", "Incoming"],
+    }
+    raw.update(columns)
+    return pd.DataFrame(raw)
+
+
+class StandardizeRowsTest(unittest.TestCase):
+    def test_missing_counterparty_is_blank(self):
+        std = CDRProcessor().standardize_rows(raw_cdr(**{
+            "A Party Number": ["9876543210", np.nan, "8765432109"],
+            "B Party Number": ["8765432109", np.nan, "9876543210"],
+        }))
+        self.assertEqual(std["CDR Party No"].iat[1], "9876543210")
+        self.assertEqual(std["Opposite Party No"].iat[1], "")
+        self.assertEqual(std["Opp Party-Name"].iat[1], "")
+
+    def test_missing_ids_are_blank_and_blanks_keep_the_float_text(self):
+        std = CDRProcessor().standardize_rows(raw_cdr(**{
+            "First CGI": ["40412", np.nan, "40413"],
+            "Last CGI": ["98", "99", "100"],
+            "IMEI": [np.nan, np.nan, np.nan],
+            "IMSI": ["404450000000001", "", np.nan],
+        }))
+        # a column with a blank is numbered as floats, rendered as before ("40412.0"); missing cells are ""
+        self.assertEqual(std["FIRST_CELL_ID_A"].tolist(), ["40412.0", "", "40413.0"])
+        self.assertEqual(std["LAST_CELL_ID_A"].tolist(), ["98", "99", "100"])
+        self.assertEqual(std["ESN_IMEI_A"].tolist(), ["", "", ""])
+        self.assertEqual(std["IMSI_A"].tolist(), ["404450000000001.0", "", ""])
+
+    def test_non_numeric_ids_are_kept_as_text(self):
+        with self.assertLogs(level="WARNING"):
+            std = CDRProcessor().standardize_rows(raw_cdr(IMEI=["ABC123", "ABC123", np.nan]))
+        self.assertEqual(std["ESN_IMEI_A"].tolist(), ["ABC123", "ABC123", ""])
+
+
+HEADER = "Target No,A Party Number,B Party Number,Date,Time,Dur(s),Service Type\n"
+ROW = "9876543210,9876543210,8765432109,01/02/2024,10:00:00,5,Outgoing\n"
+
+
+@unittest.skipIf(cdr_processor.pacsv is None, "pyarrow is not installed")
+class CsvReaderParityTest(unittest.TestCase):
+    """The pyarrow reader (with its read_csv fallbacks) must give the same frames as read_csv alone."""
+
+    def assert_same_frames(self, text):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cdr.csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            for load in (lambda p: p.load_csv_file(path), lambda p: p.load_file_frame(path, 0)):
+                arrow = load(CDRProcessor())
+                with mock.patch.object(cdr_processor, "pacsv", None):
+                    pandas = load(CDRProcessor())
+                pd.testing.assert_frame_equal(arrow, pandas)
+
+    def test_preamble_rows(self):
+        self.assert_same_frames("Report generated for request\nSome preamble, line two\n\n" + HEADER + ROW * 3)
+
+    def test_ragged_rows(self):
+        self.assert_same_frames(HEADER + ROW + "9876543210,9876543210,8765432109,01/02/2024\n"
+                                + ROW.rstrip("\n") + ",extra,fields\n" + ROW)
+
+    def test_header_only(self):
+        self.assert_same_frames(HEADER)
+
+    def test_na_tokens(self):
+        self.assert_same_frames(HEADER + ROW + "NA,null,N/A,#N/A,nan,,None\n" + "none,-,n/a,NULL,<NA>,0,NaN\n")
+
+    def test_blank_and_duplicate_headers(self):
+        self.assert_same_frames(HEADER.rstrip("\n") + ",,Date\n" + ROW.rstrip("\n") + ",x,02/02/2024\n")
+
+    def test_quoted_newlines_and_bom(self):
+        self.assert_same_frames("\ufeff" + HEADER + ROW + '9876543210,"98765\n43210",8765432109,,,,"Out\ngoing"\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
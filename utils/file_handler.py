@@ -5,11 +5,16 @@ File handling utilities for the CDR Analyzer
 """
 
 import os
+import re
 import csv
 import logging
 from pathlib import Path
 import pandas as pd
 
+# filename sanitising patterns, compiled once
+_RE_INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+_RE_REPEATED_UNDERSCORES = re.compile(r'_{2,}')
+
 class FileHandler:
     @staticmethod
     def validate_csv_file(file_path):
@@ -112,13 +117,11 @@ class FileHandler:
     @staticmethod
     def get_safe_filename(filename):
         """Get a safe filename by removing/replacing invalid characters"""
-        import re
-        
         # Remove or replace invalid characters
-        safe_name = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        safe_name = _RE_INVALID_FILENAME_CHARS.sub('_', filename)
         
         # Remove multiple underscores
-        safe_name = re.sub(r'_{2,}', '_', safe_name)
+        safe_name = _RE_REPEATED_UNDERSCORES.sub('_', safe_name)
         
         # Trim and ensure not empty
         safe_name = safe_name.strip('_').strip()